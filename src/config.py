@@ -5,7 +5,6 @@ This module centralizes all experiment parameters to ensure reproducibility
 and make it easy to adjust assumptions for sensitivity testing.
 """
 
-import pandas as pd
 from datetime import datetime, timedelta
 
 # =============================================================================
@@ -12,15 +12,31 @@ All generation is deterministic (seeded) for reproducibility.
 
 import pandas as pd
 import numpy as np
-from datetime import timedelta
-import sys
 import os
+import pyarrow as pa
+import pyarrow.parquet as pq
 
-# Add parent directory to path for imports
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from .. import config
+from ..utils.jit import njit, prange, NUMBA_AVAILABLE
 
-from src import config
 
+@njit(parallel=True, cache=True)
+def _clicks_kernel(is_treatment, device_codes, device_mult,
+                   ctr0, ctr_lift, u_click, out_clicked):
+    """
+    Fused Bernoulli kernel for clicks (Numba path).
+    
+    Computes each user's CTR from the device multiplier and compares it
+    against the pre-drawn uniform in a single pass, writing into the
+    preallocated output array. Produces the same clicks as the NumPy path
+    for the same uniforms.
+    """
+    for i in prange(is_treatment.shape[0]):
+        if is_treatment[i]:
+            ctr = ctr0 + ctr_lift * device_mult[device_codes[i]]
+        else:
+            ctr = ctr0
+        out_clicked[i] = u_click[i] < ctr
 
 class ExperimentDataGenerator:
     """
@@ -48,6 +64,22 @@ class ExperimentDataGenerator:
         self.seed = seed or config.RANDOM_SEED
         self.rng = np.random.default_rng(self.seed)
         
+        # Segment labels, probabilities and effect multipliers are fixed by
+        # config, so build the arrays once instead of on every call
+        self._device_names = np.array(list(config.DEVICE_DISTRIBUTION))
+        self._device_probs = np.fromiter(config.DEVICE_DISTRIBUTION.values(), dtype=np.float64)
+        self._device_mult = np.array([
+            config.DEVICE_EFFECT_MULTIPLIERS.get(device, 1.0) for device in self._device_names
+        ])
+        self._country_names = np.array(list(config.COUNTRY_DISTRIBUTION))
+        self._country_probs = np.fromiter(config.COUNTRY_DISTRIBUTION.values(), dtype=np.float64)
+        
+        # Cumulative distributions for inverse-CDF segment sampling
+        self._device_cdf = np.cumsum(self._device_probs)
+        self._device_cdf /= self._device_cdf[-1]
+        self._country_cdf = np.cumsum(self._country_probs)
+        self._country_cdf /= self._country_cdf[-1]
+        
     def generate(self):
         """
         Generate complete experiment dataset.
@@ -59,121 +91,176 @@ class ExperimentDataGenerator:
         """
         print(f"Generating synthetic data for {self.n_users:,} users...")
         
-        # Start with user IDs
+        df = self._generate_chunk(0, self.n_users, self.rng)
+        
+        print(f"✓ Generated {len(df):,} users")
+        print(f"  - Control: {(df['variant'] == 'control').sum():,}")
+        print(f"  - Treatment: {(df['variant'] == 'treatment').sum():,}")
+        print(f"  - Eligible: {df['eligible'].sum():,}")
+        
+        return df
+    
+    def generate_chunks(self, chunk_size=1_000_000):
+        """
+        Generate the experiment dataset as a stream of row chunks.
+        
+        Bounds peak memory for very large N: only one chunk is held at a
+        time, and `save` can write the chunks incrementally. Each chunk
+        draws from its own stream spawned from the seed's SeedSequence, so
+        output depends only on the seed and chunk size (not on earlier use
+        of this instance). It is not the same sample as `generate()`,
+        which draws all users from the instance RNG.
+        
+        Parameters
+        ----------
+        chunk_size : int
+            Maximum number of users per chunk
+        
+        Yields
+        ------
+        pd.DataFrame
+            User-level experiment data for consecutive user ID ranges
+        """
+        print(f"Generating synthetic data for {self.n_users:,} users "
+              f"in chunks of {chunk_size:,}...")
+        
+        starts = range(0, self.n_users, chunk_size)
+        streams = np.random.SeedSequence(self.seed).spawn(len(starts))
+        for start, stream in zip(starts, streams):
+            yield self._generate_chunk(
+                start, min(start + chunk_size, self.n_users), np.random.default_rng(stream)
+            )
+    
+    def _generate_chunk(self, start, stop, rng):
+        """Generate all fields for users with IDs in [start, stop), drawing from `rng`."""
+        n = stop - start
+        
+        # Start with user IDs (zero-padded, e.g. 'user_0000042')
+        user_numbers = np.char.zfill(np.arange(start, stop).astype(str), 7)
         df = pd.DataFrame({
-            'user_id': [f'user_{i:07d}' for i in range(self.n_users)]
+            'user_id': np.char.add('user_', user_numbers)
         })
         
-        df['experiment_id'] = config.EXPERIMENT_ID
+        # Constant per dataset: keep it as experiment-level metadata and store
+        # the required column as a single-category categorical (1 byte/row)
+        df.attrs['experiment_id'] = config.EXPERIMENT_ID
+        df['experiment_id'] = pd.Categorical.from_codes(
+            np.zeros(n, dtype=np.int8), categories=[config.EXPERIMENT_ID]
+        )
         
         # Random variant assignment (this is the core of randomization)
-        df['variant'] = self.rng.choice(
-            ['control', 'treatment'],
-            size=self.n_users,
-            p=[config.ALLOCATION_RATIO, 1 - config.ALLOCATION_RATIO]
+        # Control with probability ALLOCATION_RATIO, otherwise treatment
+        is_treatment = rng.random(n) >= config.ALLOCATION_RATIO
+        df['variant'] = pd.Categorical.from_codes(
+            is_treatment.astype(np.int8), categories=['control', 'treatment']
         )
         
         # Assignment timestamp (random within first day of experiment)
         assignment_window_hours = 24
-        df['assigned_at'] = [
-            config.EXPERIMENT_START + timedelta(
-                hours=self.rng.uniform(0, assignment_window_hours)
-            )
-            for _ in range(self.n_users)
-        ]
+        assignment_offsets_hours = rng.uniform(0, assignment_window_hours, size=n)
+        df['assigned_at'] = (
+            pd.Timestamp(config.EXPERIMENT_START)
+            + pd.to_timedelta(assignment_offsets_hours, unit='h')
+        )
         
         # Exposure timestamp (a bit after assignment)
         # Some users are exposed quickly, others take longer
-        exposure_delays_hours = self.rng.exponential(scale=2.0, size=self.n_users)
+        exposure_delays_hours = rng.exponential(scale=2.0, size=n)
         df['first_exposed_at'] = df['assigned_at'] + pd.to_timedelta(exposure_delays_hours, unit='h')
         
         # Eligibility: filter out bots, crawlers, etc.
-        df['eligible'] = self.rng.choice(
-            [True, False],
-            size=self.n_users,
-            p=[config.ELIGIBILITY_RATE, 1 - config.ELIGIBILITY_RATE]
-        )
+        df['eligible'] = rng.random(n) < config.ELIGIBILITY_RATE
         
         # Assign segments (these are independent of variant assignment)
-        df = self._assign_segments(df)
+        df = self._assign_segments(df, rng)
         
         # Generate outcomes conditional on variant and segments
-        df = self._generate_outcomes(df)
+        df = self._generate_outcomes(df, is_treatment, rng)
         
         # Add optional guardrail metrics
-        df = self._generate_guardrails(df)
+        df = self._generate_guardrails(df, is_treatment, rng)
         
-        print(f"✓ Generated {len(df):,} users")
-        print(f"  - Control: {(df['variant'] == 'control').sum():,}")
-        print(f"  - Treatment: {(df['variant'] == 'treatment').sum():,}")
-        print(f"  - Eligible: {df['eligible'].sum():,}")
+        # Compact dtypes for a smaller working set and parquet file
+        df = self._downcast_dtypes(df)
         
         return df
     
-    def _assign_segments(self, df):
+    def _assign_segments(self, df, rng):
         """Assign device and country segments independently of variant."""
         n = len(df)
         
         # Device assignment (weighted by realistic distribution)
-        devices = list(config.DEVICE_DISTRIBUTION.keys())
-        device_probs = list(config.DEVICE_DISTRIBUTION.values())
-        df['device_category'] = self.rng.choice(devices, size=n, p=device_probs)
+        device_codes = np.searchsorted(self._device_cdf, rng.random(n), side='right')
+        df['device_category'] = pd.Categorical.from_codes(
+            device_codes, categories=self._device_names
+        )
         
         # Country assignment
-        countries = list(config.COUNTRY_DISTRIBUTION.keys())
-        country_probs = list(config.COUNTRY_DISTRIBUTION.values())
-        df['country'] = self.rng.choice(countries, size=n, p=country_probs)
+        country_codes = np.searchsorted(self._country_cdf, rng.random(n), side='right')
+        df['country'] = pd.Categorical.from_codes(
+            country_codes, categories=self._country_names
+        )
         
         return df
     
-    def _generate_outcomes(self, df):
+    def _generate_outcomes(self, df, is_treatment, rng):
         """
         Generate binary outcomes (clicked, converted) based on variant.
         
+        `is_treatment` is the boolean assignment array the variant column
+        was built from (avoids re-comparing the categorical as strings).
+        
         Key assumptions:
         - Control group has baseline CTR and CVR
         - Treatment group has lift in both metrics
         - If heterogeneity is enabled, lift varies by device
         - Conversion implies click (logical dependency)
         """
+        # Bind config parameters once
+        ctr0, ctr_lift = config.CONTROL_CTR, config.TREATMENT_CTR_LIFT_PP
+        cvr0, cvr_lift = config.CONTROL_CVR, config.TREATMENT_CVR_LIFT_PP
+        enable_heterogeneity = config.ENABLE_HETEROGENEITY
+        
         n = len(df)
+        device_codes = pd.Categorical(
+            df['device_category'], categories=self._device_names
+        ).codes
         
-        # Initialize outcomes
-        df['clicked'] = False
-        df['converted'] = False
-        
-        for idx, row in df.iterrows():
-            variant = row['variant']
-            device = row['device_category']
-            
-            # Determine CTR and CVR for this user
-            if variant == 'control':
-                ctr = config.CONTROL_CTR
-                cvr = config.CONTROL_CVR
-            else:
-                # Apply base lift
-                ctr_lift = config.TREATMENT_CTR_LIFT_PP
-                cvr_lift = config.TREATMENT_CVR_LIFT_PP
-                
-                # Apply device-specific multiplier if heterogeneity is enabled
-                if config.ENABLE_HETEROGENEITY:
-                    multiplier = config.DEVICE_EFFECT_MULTIPLIERS.get(device, 1.0)
-                    ctr_lift *= multiplier
-                    cvr_lift *= multiplier
-                
-                ctr = config.CONTROL_CTR + ctr_lift
-                cvr = config.CONTROL_CVR + cvr_lift
-            
-            # Generate outcomes (Bernoulli trials)
-            clicked = self.rng.random() < ctr
-            converted = self.rng.random() < cvr if clicked else False
-            
-            df.at[idx, 'clicked'] = clicked
-            df.at[idx, 'converted'] = converted
+        # Apply device-specific multiplier if heterogeneity is enabled
+        if enable_heterogeneity:
+            device_mult = self._device_mult
+        else:
+            device_mult = np.ones(len(self._device_names))
+        
+        u_click = rng.random(n)
+        
+        if NUMBA_AVAILABLE:
+            clicked = np.empty(n, dtype=np.bool_)
+            _clicks_kernel(
+                is_treatment, device_codes, device_mult,
+                ctr0, ctr_lift, u_click, clicked
+            )
+        else:
+            # Determine CTR for every user (treatment gets the lift)
+            ctr = np.where(is_treatment, ctr0 + ctr_lift * device_mult[device_codes], ctr0)
+            clicked = u_click < ctr
+        
+        # Conversion implies click, so only clicked users need a CVR draw
+        clicked_idx = np.flatnonzero(clicked)
+        cvr = np.where(
+            is_treatment[clicked_idx],
+            cvr0 + cvr_lift * device_mult[device_codes[clicked_idx]],
+            cvr0
+        )
+        converted = np.zeros(n, dtype=bool)
+        converted[clicked_idx] = rng.random(clicked_idx.size) < cvr
+        
+        df['clicked'] = clicked
+        df['converted'] = converted
         
         return df
     
-    def _generate_guardrails(self, df):
+    def _generate_guardrails(self, df, is_treatment, rng):
         """
         Add optional guardrail metrics (bounce, session duration).
         
@@ -185,46 +272,79 @@ class ExperimentDataGenerator:
         # Bounce rate: treatment might have slightly higher bounce
         # This creates a tradeoff scenario
         base_bounce_prob = 0.35
-        df['bounce'] = False
-        
-        for idx, row in df.iterrows():
-            if row['variant'] == 'treatment':
-                bounce_prob = base_bounce_prob + 0.02  # Slight increase
-            else:
-                bounce_prob = base_bounce_prob
-            
-            df.at[idx, 'bounce'] = self.rng.random() < bounce_prob
+        bounce_prob = np.where(is_treatment, base_bounce_prob + 0.02, base_bounce_prob)
+        df['bounce'] = rng.random(n) < bounce_prob
         
         # Session duration: generate realistic durations
         # Treatment might have slightly shorter sessions (people convert faster)
         control_mean_duration = 180  # seconds
         treatment_mean_duration = 165  # slightly shorter
         
-        durations = []
-        for variant in df['variant']:
-            mean_dur = treatment_mean_duration if variant == 'treatment' else control_mean_duration
-            # Use lognormal for realistic session duration distribution
-            dur = self.rng.lognormal(mean=np.log(mean_dur), sigma=0.8)
-            durations.append(int(max(10, dur)))  # At least 10 seconds
+        mean_dur = np.where(is_treatment, treatment_mean_duration, control_mean_duration)
+        # Use lognormal for realistic session duration distribution
+        durations = rng.lognormal(mean=np.log(mean_dur), sigma=0.8, size=n)
+        df['session_duration_sec'] = np.maximum(10, durations).astype(np.int32)  # At least 10 seconds
+        df['sessions'] = rng.integers(1, 5, size=n)  # Random session count
         
-        df['session_duration_sec'] = durations
-        df['sessions'] = self.rng.integers(1, 5, size=n)  # Random session count
+        return df
+    
+    def _downcast_dtypes(self, df):
+        """Store flags as bool and small integer columns in narrow dtypes."""
+        for col in ['eligible', 'clicked', 'converted', 'bounce']:
+            df[col] = df[col].astype(bool)
+        
+        df['sessions'] = df['sessions'].astype(np.int8)
+        df['session_duration_sec'] = df['session_duration_sec'].astype(np.int32)
         
         return df
     
     def save(self, df, output_path='data/experiment_users.parquet'):
-        """Save dataset to parquet for efficient storage."""
+        """
+        Save dataset to parquet for efficient storage.
+        
+        `df` may be a single DataFrame or an iterable of DataFrame chunks
+        (e.g. from `generate_chunks`); chunks are streamed to the file one
+        at a time, so memory stays bounded by the chunk size.
+        """
         full_path = os.path.join(
             os.path.dirname(__file__), 
             '../../', 
             output_path
         )
         os.makedirs(os.path.dirname(full_path), exist_ok=True)
-        df.to_parquet(full_path, index=False)
+        
+        chunks = [df] if isinstance(df, pd.DataFrame) else df
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                
+                if writer is None:
+                    # Record the experiment ID in the file metadata as well
+                    experiment_id = chunk.attrs.get('experiment_id', config.EXPERIMENT_ID)
+                    schema = table.schema.with_metadata({
+                        **(table.schema.metadata or {}),
+                        b'experiment_id': experiment_id.encode()
+                    })
+                    # zstd + dictionary encoding keeps the categorical/boolean
+                    # columns compact
+                    writer = pq.ParquetWriter(
+                        full_path,
+                        schema,
+                        compression='zstd',
+                        compression_level=3,
+                        use_dictionary=True
+                    )
+                
+                # Row groups are sized for efficient columnar reads downstream
+                writer.write_table(table, row_group_size=131072)
+        finally:
+            if writer is not None:
+                writer.close()
+        
         print(f"✓ Saved to {output_path}")
         return full_path
 
-
 def main():
     """CLI entry point for generating data."""
     generator = ExperimentDataGenerator()
@@ -9,10 +9,12 @@ import numpy as np
 from dataclasses import dataclass
 from typing import Dict
 
+from ..utils.compat import DATACLASS_SLOTS
 
-@dataclass
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class MetricReport:
-    """Container for computed metrics by variant."""
+    """Container for computed metrics by variant (immutable, hashable)."""
     metric_name: str
     control_n: int
     control_successes: int
@@ -67,8 +69,19 @@ class MetricComputer:
         eligible_only : bool
             Whether to filter to eligible users only (recommended)
         """
-        self.df = df[df['eligible']] if eligible_only else df
+        # Keep the original frame and a row mask rather than a filtered copy;
+        # each computation selects only the columns it needs
+        self.df = df
         self.eligible_only = eligible_only
+        self._mask = df['eligible'].to_numpy(dtype=bool) if eligible_only else slice(None)
+        
+        # The frame is treated as immutable during analysis, so metric
+        # reports are computed once and reused by later callers
+        self._metric_cache = {}
+    
+    def _select(self, columns):
+        """Return the analysis rows restricted to the given columns."""
+        return self.df.loc[self._mask, columns]
     
     def compute_ctr(self) -> MetricReport:
         """Compute Click-Through Rate (CTR) by variant."""
@@ -94,16 +107,28 @@ class MetricComputer:
         MetricReport
             Computed metrics with lift
         """
-        control = self.df[self.df['variant'] == 'control']
-        treatment = self.df[self.df['variant'] == 'treatment']
+        key = (metric_name, outcome_col)
+        if key not in self._metric_cache:
+            self._metric_cache[key] = self._build_binary_metric(metric_name, outcome_col)
+        return self._metric_cache[key]
+    
+    def _build_binary_metric(self, metric_name: str, outcome_col: str) -> MetricReport:
+        """Aggregate a binary outcome by variant (uncached)."""
+        # Single pass over the frame: successes and sample size per variant
+        counts = (
+            self._select(['variant', outcome_col])
+            .groupby('variant', observed=True)[outcome_col]
+            .agg(['sum', 'size'])
+            .reindex(['control', 'treatment'], fill_value=0)
+        )
         
         # Counts
-        control_n = len(control)
-        control_successes = control[outcome_col].sum()
+        control_n = int(counts.at['control', 'size'])
+        control_successes = int(counts.at['control', 'sum'])
         control_rate = control_successes / control_n if control_n > 0 else 0
         
-        treatment_n = len(treatment)
-        treatment_successes = treatment[outcome_col].sum()
+        treatment_n = int(counts.at['treatment', 'size'])
+        treatment_successes = int(counts.at['treatment', 'sum'])
         treatment_rate = treatment_successes / treatment_n if treatment_n > 0 else 0
         
         # Lifts
@@ -138,46 +163,50 @@ class MetricComputer:
         pd.DataFrame
             Segment-level metrics with lifts
         """
-        segments = self.df[segment_col].unique()
-        results = []
+        # One pass over the frame: successes and sample size per (segment, variant)
+        counts = (
+            self._select([segment_col, 'variant', metric_col])
+            .groupby([segment_col, 'variant'], observed=True)[metric_col]
+            .agg(['sum', 'size'])
+            .unstack('variant', fill_value=0)
+            .reindex(
+                columns=pd.MultiIndex.from_product([['sum', 'size'], ['control', 'treatment']]),
+                fill_value=0
+            )
+        )
+        
+        control_successes, control_n = counts[('sum', 'control')], counts[('size', 'control')]
+        treatment_successes, treatment_n = counts[('sum', 'treatment')], counts[('size', 'treatment')]
+        
+        control_rate = (control_successes / control_n.where(control_n > 0)).fillna(0)
+        treatment_rate = (treatment_successes / treatment_n.where(treatment_n > 0)).fillna(0)
+        
+        lift = treatment_rate - control_rate
+        rel_lift = (lift / control_rate.where(control_rate > 0) * 100).fillna(0)
         
-        for segment in segments:
-            segment_df = self.df[self.df[segment_col] == segment]
-            
-            control = segment_df[segment_df['variant'] == 'control']
-            treatment = segment_df[segment_df['variant'] == 'treatment']
-            
-            control_n = len(control)
-            control_rate = control[metric_col].mean() if control_n > 0 else 0
-            
-            treatment_n = len(treatment)
-            treatment_rate = treatment[metric_col].mean() if treatment_n > 0 else 0
-            
-            lift = treatment_rate - control_rate
-            rel_lift = (lift / control_rate * 100) if control_rate > 0 else 0
-            
-            results.append({
-                'segment': segment,
-                'control_n': control_n,
-                'control_rate': control_rate,
-                'treatment_n': treatment_n,
-                'treatment_rate': treatment_rate,
-                'absolute_lift': lift,
-                'relative_lift_pct': rel_lift
-            })
+        results = pd.DataFrame({
+            'segment': counts.index,
+            'control_n': control_n.to_numpy(dtype=np.int64),
+            'control_rate': control_rate.to_numpy(dtype=np.float64),
+            'treatment_n': treatment_n.to_numpy(dtype=np.int64),
+            'treatment_rate': treatment_rate.to_numpy(dtype=np.float64),
+            'absolute_lift': lift.to_numpy(dtype=np.float64),
+            'relative_lift_pct': rel_lift.to_numpy(dtype=np.float64)
+        })
         
-        return pd.DataFrame(results).sort_values('control_n', ascending=False)
+        return results.sort_values('control_n', ascending=False)
 
 
 def main():
     """CLI for computing metrics on saved dataset."""
-    import sys
-    import os
-    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+    from ..utils.io import load_experiment_data
     
     data_path = 'data/experiment_users.parquet'
     print(f"Loading data from {data_path}...")
-    df = pd.read_parquet(data_path)
+    df = load_experiment_data(
+        data_path,
+        columns=['variant', 'eligible', 'clicked', 'converted', 'device_category']
+    )
     
     computer = MetricComputer(df, eligible_only=True)
     
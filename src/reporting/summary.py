@@ -5,12 +5,10 @@ Creates executive summaries and decision recommendations.
 """
 
 from typing import List
-import sys
 import os
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-from src import config
-from src.stats.inference import InferenceReport
+from .. import config
+from ..stats.inference import InferenceReport
 
 
 class ReportBuilder:
@@ -23,6 +21,26 @@ class ReportBuilder:
     - Guardrail constraints
     """
     
+    @staticmethod
+    def _decide(cvr_inference: InferenceReport) -> dict:
+        """
+        Apply the ship/no-ship rule to the primary metric.
+        
+        Both reports use this so the decision logic lives in one place.
+        Also precomputes the percentage-point values the reports display.
+        """
+        ci_lower_meets_threshold = cvr_inference.ci_lower >= config.MIN_ACCEPTABLE_CVR_LIFT
+        positive_lift = cvr_inference.absolute_lift > 0
+        
+        return {
+            'ship': ci_lower_meets_threshold and positive_lift,
+            'positive_lift': positive_lift,
+            'ci_lower_meets_threshold': ci_lower_meets_threshold,
+            'abs_lift_pp': cvr_inference.absolute_lift * 100,
+            'ci_lower_pp': cvr_inference.ci_lower * 100,
+            'ci_upper_pp': cvr_inference.ci_upper * 100
+        }
+    
     @staticmethod
     def build_executive_summary(
         cvr_inference: InferenceReport,
@@ -47,16 +65,16 @@ class ReportBuilder:
             Markdown content
         """
         # Decision logic
-        ci_lower_meets_threshold = cvr_inference.ci_lower >= config.MIN_ACCEPTABLE_CVR_LIFT
+        outcome = ReportBuilder._decide(cvr_inference)
         
-        if ci_lower_meets_threshold and cvr_inference.absolute_lift > 0:
+        if outcome['ship']:
             decision = "**SHIP** ✓"
             rationale = (
                 "The treatment shows a positive lift in conversion rate with "
                 "high confidence. The 95% CI lower bound is non-negative, "
                 "meeting our decision threshold."
             )
-        elif cvr_inference.absolute_lift > 0:
+        elif outcome['positive_lift']:
             decision = "**HOLD / EXTEND TEST**"
             rationale = (
                 "The treatment shows a positive directional lift, but the "
@@ -74,7 +92,7 @@ class ReportBuilder:
         import pandas as pd
         timestamp = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        if "SHIP" in decision:
+        if outcome['ship']:
             next_steps = "1. **Proceed with full rollout** to 100% of users\n2. Monitor post-launch metrics for regression\n3. Document learnings for future experiments"
         else:
             next_steps = "1. **Investigate why the treatment did not improve conversion**\n2. Analyze segment-level results for insights\n3. Iterate on design based on qualitative feedback"
@@ -106,7 +124,7 @@ class ReportBuilder:
 |--------|---------|-----------|-----------------|-----------------|--------|
 | CVR | {cvr_inference.control_rate:.2%} | {cvr_inference.treatment_rate:.2%} | {cvr_inference.absolute_lift:+.2%} | {cvr_inference.relative_lift_pct:+.1f}% | [{cvr_inference.ci_lower:+.2%}, {cvr_inference.ci_upper:+.2%}] |
 
-**Interpretation:** The redesign improved CVR by {cvr_inference.absolute_lift*100:.2f} percentage points ({cvr_inference.relative_lift_pct:+.1f}% relative lift). We are 95% confident the true lift is between {cvr_inference.ci_lower*100:.2f}pp and {cvr_inference.ci_upper*100:.2f}pp.
+**Interpretation:** The redesign improved CVR by {outcome['abs_lift_pp']:.2f} percentage points ({cvr_inference.relative_lift_pct:+.1f}% relative lift). We are 95% confident the true lift is between {outcome['ci_lower_pp']:.2f}pp and {outcome['ci_upper_pp']:.2f}pp.
 
 ### Secondary Metric: Click-Through Rate
 
@@ -175,6 +193,8 @@ class ReportBuilder:
         content : str
             Markdown content
         """
+        outcome = ReportBuilder._decide(cvr_inference)
+        
         content = f"""# Experiment One-Pager: {config.EXPERIMENT_ID}
 
 ## Quick Facts
@@ -201,13 +221,13 @@ class ReportBuilder:
 
 ## Decision
 
-{"✓ SHIP" if cvr_inference.ci_lower >= 0 and cvr_inference.absolute_lift > 0 else "✗ DO NOT SHIP / HOLD"}
+{"✓ SHIP" if outcome['ship'] else "✗ DO NOT SHIP / HOLD"}
 
 ## Key Takeaways
 
-- Homepage redesign {"improved" if cvr_inference.absolute_lift > 0 else "did not improve"} conversion
+- Homepage redesign {"improved" if outcome['positive_lift'] else "did not improve"} conversion
 - {"Both CTR and CVR moved in the expected direction" if ctr_inference.absolute_lift > 0 and cvr_inference.absolute_lift > 0 else "Results show mixed directional signals"}
-- {"Confidence interval supports positive effect" if cvr_inference.ci_lower >= 0 else "Confidence interval includes zero - more data may be needed"}
+- {"Confidence interval supports positive effect" if outcome['ci_lower_meets_threshold'] else "Confidence interval includes zero - more data may be needed"}
 """
         
         # Save to file
@@ -5,18 +5,91 @@ Implements two-sample proportion tests with confidence intervals.
 Focuses on effect sizes and uncertainty quantification.
 """
 
+import math
 import numpy as np
-from scipy import stats
 from dataclasses import dataclass
-import sys
-import os
+from functools import lru_cache
+from typing import List
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-from src import config
-from src.metrics.compute import MetricReport
+from .. import config
+from ..metrics.compute import MetricReport
+from ..utils.compat import DATACLASS_SLOTS
+from ..utils.jit import njit
 
 
-@dataclass
+@njit(cache=True)
+def _diff_ci(p1, n1, p2, n2, z_crit):
+    """Unpooled-SE confidence interval for p2 - p1 (scalar kernel)."""
+    diff = p2 - p1
+    se = math.sqrt(p1 * (1 - p1) / n1 + p2 * (1 - p2) / n2)
+    margin = z_crit * se
+    return diff - margin, diff + margin
+
+
+@njit(cache=True)
+def _ztest_pooled(x1, n1, x2, n2):
+    """Two-sided pooled two-proportion z-test p-value (scalar kernel)."""
+    p1 = x1 / n1
+    p2 = x2 / n2
+    p_pooled = (x1 + x2) / (n1 + n2)
+    se_null = math.sqrt(p_pooled * (1 - p_pooled) * (1 / n1 + 1 / n2))
+    if se_null == 0.0:
+        # Both groups all-success or all-failure: no observed difference
+        return 1.0
+    z_stat = (p2 - p1) / se_null
+    # 2 * (1 - Phi(|z|)) == erfc(|z| / sqrt(2))
+    return math.erfc(abs(z_stat) / math.sqrt(2.0))
+
+
+@njit(cache=True)
+def _diff_ci_ztest_unpooled(p1, n1, p2, n2, z_crit):
+    """CI bounds and z-test p-value for p2 - p1 from one unpooled SE (scalar kernel)."""
+    diff = p2 - p1
+    se = math.sqrt(p1 * (1 - p1) / n1 + p2 * (1 - p2) / n2)
+    margin = z_crit * se
+    if se == 0.0:
+        # Each group all-success or all-failure: the difference is exact,
+        # so it is either no effect or certainly non-zero
+        return diff - margin, diff + margin, 1.0 if diff == 0.0 else 0.0
+    p_value = math.erfc(abs(diff / se) / math.sqrt(2.0))
+    return diff - margin, diff + margin, p_value
+
+
+_special = None
+
+
+def _get_special():
+    """
+    Import scipy.special on first use.
+    
+    Modules that only need the report dataclasses (e.g. reporting) then
+    skip the import cost.
+    """
+    global _special
+    if _special is None:
+        import scipy.special as _s
+        _special = _s
+    return _special
+
+
+@lru_cache(maxsize=None)
+def _normal_quantile(q):
+    """Standard normal quantile, memoized (only a few levels are ever used)."""
+    return float(_get_special().ndtri(q))
+
+
+@lru_cache(maxsize=64)
+def _mde(z_crit, baseline_rate, n_per_variant, power):
+    """MDE for a two-sided test, memoized on the critical z and the design."""
+    z_beta = _normal_quantile(power)
+    
+    # Simplified MDE formula (assumes similar variance in both groups)
+    # MDE = (z_alpha + z_beta) * sqrt(2 * p * (1-p) / n)
+    p = baseline_rate
+    return (z_crit + z_beta) * math.sqrt(2 * p * (1 - p) / n_per_variant)
+
+
+@dataclass(**DATACLASS_SLOTS)
 class InferenceReport:
     """Results from statistical inference on a metric."""
     metric_name: str
@@ -65,9 +138,17 @@ class InferenceEngine:
     - Two-sample z-test for proportions
     - Confidence intervals for difference in proportions
     - Proper standard error calculation
+    
+    By default the p-value comes from the textbook z-test, which uses the
+    pooled SE under the null, while the CI uses the unpooled SE. With
+    `use_unpooled_se=True` both come from the single unpooled SE: one
+    fewer SE and tail evaluation, and significance is then exactly
+    "0 outside the CI". The two SEs differ only slightly when n is large
+    and the rates are close; the unpooled test is a little less
+    conservative when the groups' rates differ a lot.
     """
     
-    def __init__(self, confidence_level=None):
+    def __init__(self, confidence_level=None, use_unpooled_se=False):
         """
         Initialize inference engine.
         
@@ -75,9 +156,16 @@ class InferenceEngine:
         ----------
         confidence_level : float, optional
             Confidence level (default from config)
+        use_unpooled_se : bool
+            Derive the p-value from the unpooled SE used for the CI instead
+            of the pooled-SE z-test (default False)
         """
         self.confidence_level = confidence_level or config.CONFIDENCE_LEVEL
         self.alpha = 1 - self.confidence_level
+        self.use_unpooled_se = use_unpooled_se
+        
+        # Z-score for the two-sided confidence level (fixed per engine)
+        self._z_crit = _normal_quantile(1 - self.alpha / 2)
     
     def analyze_metric(self, metric_report: MetricReport) -> InferenceReport:
         """
@@ -102,11 +190,17 @@ class InferenceEngine:
         x2 = metric_report.treatment_successes
         p2 = metric_report.treatment_rate
         
-        # Compute confidence interval for difference in proportions
-        ci_lower, ci_upper = self._proportion_diff_ci(p1, n1, p2, n2)
-        
-        # Compute p-value using two-sample z-test
-        p_value = self._proportion_z_test(x1, n1, x2, n2)
+        if self.use_unpooled_se:
+            # CI and p-value from one shared unpooled SE
+            ci_lower, ci_upper, p_value = _diff_ci_ztest_unpooled(
+                float(p1), float(n1), float(p2), float(n2), self._z_crit
+            )
+        else:
+            # Compute confidence interval for difference in proportions
+            ci_lower, ci_upper = self._proportion_diff_ci(p1, n1, p2, n2)
+            
+            # Compute p-value using two-sample z-test
+            p_value = self._proportion_z_test(x1, n1, x2, n2)
         
         # Determine statistical significance
         significant = p_value < self.alpha
@@ -124,6 +218,113 @@ class InferenceEngine:
             confidence_level=self.confidence_level
         )
     
+    def analyze_metrics(self, metric_reports: List[MetricReport]) -> List[InferenceReport]:
+        """
+        Perform statistical inference on several metrics at once.
+        
+        Equivalent to calling `analyze_metric` on each report, but the
+        standard errors, confidence intervals and p-values are computed as
+        arrays in a single vectorized pass (useful for per-segment reports).
+        
+        Parameters
+        ----------
+        metric_reports : list of MetricReport
+            Precomputed metrics from MetricComputer
+        
+        Returns
+        -------
+        list of InferenceReport
+            Inference results in the same order as the input
+        """
+        if not metric_reports:
+            return []
+        
+        n1 = np.array([r.control_n for r in metric_reports], dtype=np.float64)
+        x1 = np.array([r.control_successes for r in metric_reports], dtype=np.float64)
+        p1 = np.array([r.control_rate for r in metric_reports], dtype=np.float64)
+        
+        n2 = np.array([r.treatment_n for r in metric_reports], dtype=np.float64)
+        x2 = np.array([r.treatment_successes for r in metric_reports], dtype=np.float64)
+        p2 = np.array([r.treatment_rate for r in metric_reports], dtype=np.float64)
+        
+        # Confidence intervals for the difference in proportions
+        se = np.sqrt(p1 * (1 - p1) / n1 + p2 * (1 - p2) / n2)
+        margin = self._z_crit * se
+        ci_lower = (p2 - p1) - margin
+        ci_upper = (p2 - p1) + margin
+        
+        if self.use_unpooled_se:
+            # Zero SE means an exact difference: z = 0 if none, else infinite
+            diff = p2 - p1
+            with np.errstate(divide='ignore', invalid='ignore'):
+                z_stat = np.where(se == 0, np.where(diff == 0, 0.0, np.inf), diff / se)
+        else:
+            # Two-sample z-tests with pooled standard errors
+            p_pooled = (x1 + x2) / (n1 + n2)
+            se_null = np.sqrt(p_pooled * (1 - p_pooled) * (1 / n1 + 1 / n2))
+            # Both groups all-success or all-failure: no observed difference
+            # (z = 0, p = 1), matching the scalar kernel
+            with np.errstate(divide='ignore', invalid='ignore'):
+                z_stat = np.where(se_null == 0, 0.0, (x2 / n2 - x1 / n1) / se_null)
+        p_values = 2 * _get_special().ndtr(-np.abs(z_stat))
+        
+        return [
+            InferenceReport(
+                metric_name=report.metric_name,
+                control_rate=report.control_rate,
+                treatment_rate=report.treatment_rate,
+                absolute_lift=report.absolute_lift,
+                relative_lift_pct=report.relative_lift_pct,
+                ci_lower=lower,
+                ci_upper=upper,
+                p_value=p_value,
+                statistically_significant=p_value < self.alpha,
+                confidence_level=self.confidence_level
+            )
+            for report, lower, upper, p_value in zip(
+                metric_reports, ci_lower.tolist(), ci_upper.tolist(), p_values.tolist()
+            )
+        ]
+    
+    @staticmethod
+    def adjust_pvalues(p_values, method='bh'):
+        """
+        Adjust p-values for multiple testing (e.g., per-segment tests).
+        
+        Benjamini-Hochberg controls the false discovery rate across the K
+        tests with a single sort and a running minimum. Matches the
+        semantics of `scipy.stats.false_discovery_control(method='bh')`.
+        
+        Parameters
+        ----------
+        p_values : array-like
+            Unadjusted p-values
+        method : str
+            Adjustment method; only 'bh' (Benjamini-Hochberg) is supported
+        
+        Returns
+        -------
+        np.ndarray
+            Adjusted p-values in the same order as the input
+        """
+        if method != 'bh':
+            raise ValueError(f"Unsupported p-value adjustment method: {method!r}")
+        
+        p_values = np.asarray(p_values, dtype=np.float64)
+        k = p_values.size
+        if k == 0:
+            return p_values.copy()
+        
+        order = np.argsort(p_values)
+        ranked = p_values[order] * k / np.arange(1, k + 1)
+        
+        # Enforce monotonicity from the largest p-value downwards
+        adjusted = np.minimum.accumulate(ranked[::-1])[::-1]
+        
+        result = np.empty_like(adjusted)
+        result[order] = np.clip(adjusted, 0, 1)
+        return result
+    
     def _proportion_diff_ci(self, p1, n1, p2, n2):
         """
         Compute confidence interval for difference in proportions.
@@ -143,20 +344,9 @@ class InferenceEngine:
         ci_lower, ci_upper : float
             Lower and upper bounds of confidence interval for (p2 - p1)
         """
-        diff = p2 - p1
-        
-        # Standard error of difference
-        se = np.sqrt(p1 * (1 - p1) / n1 + p2 * (1 - p2) / n2)
-        
-        # Z-score for confidence level
-        z = stats.norm.ppf(1 - self.alpha / 2)
-        
-        # Confidence interval
-        margin = z * se
-        ci_lower = diff - margin
-        ci_upper = diff + margin
-        
-        return ci_lower, ci_upper
+        return _diff_ci(
+            float(p1), float(n1), float(p2), float(n2), self._z_crit
+        )
     
     def _proportion_z_test(self, x1, n1, x2, n2):
         """
@@ -177,22 +367,8 @@ class InferenceEngine:
         p_value : float
             Two-sided p-value
         """
-        p1 = x1 / n1
-        p2 = x2 / n2
-        
-        # Pooled proportion (under null hypothesis)
-        p_pooled = (x1 + x2) / (n1 + n2)
-        
-        # Standard error under null (using pooled proportion)
-        se_null = np.sqrt(p_pooled * (1 - p_pooled) * (1/n1 + 1/n2))
-        
-        # Z-statistic
-        z_stat = (p2 - p1) / se_null
-        
-        # Two-sided p-value
-        p_value = 2 * (1 - stats.norm.cdf(abs(z_stat)))
-        
-        return p_value
+        # Pooled standard error under the null; math.erfc for the tail
+        return _ztest_pooled(float(x1), float(n1), float(x2), float(n2))
     
     def compute_mde(self, baseline_rate, n_per_variant, power=0.8):
         """
@@ -220,30 +396,21 @@ class InferenceEngine:
         mde : float
             Minimum detectable effect (absolute, in proportion units)
         """
-        # Z-scores for alpha and power
-        z_alpha = stats.norm.ppf(1 - self.alpha / 2)
-        z_beta = stats.norm.ppf(power)
-        
-        # Simplified MDE formula (assumes similar variance in both groups)
-        # MDE = (z_alpha + z_beta) * sqrt(2 * p * (1-p) / n)
-        p = baseline_rate
-        mde = (z_alpha + z_beta) * np.sqrt(2 * p * (1 - p) / n_per_variant)
-        
-        return mde
+        # Keyed on the engine's z-critical rather than self, so the cache
+        # is shared by engines with the same confidence level
+        return _mde(self._z_crit, baseline_rate, n_per_variant, power)
 
 
 def main():
     """CLI for running inference on metrics."""
-    import sys
-    import os
-    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-    
-    import pandas as pd
-    from src.metrics.compute import MetricComputer
+    from ..metrics.compute import MetricComputer
+    from ..utils.io import load_experiment_data
     
     data_path = 'data/experiment_users.parquet'
     print(f"Loading data from {data_path}...")
-    df = pd.read_parquet(data_path)
+    df = load_experiment_data(
+        data_path, columns=['variant', 'eligible', 'clicked', 'converted']
+    )
     
     # Compute metrics
     computer = MetricComputer(df, eligible_only=True)
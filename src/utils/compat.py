@@ -0,0 +1,9 @@
+"""
+Python version compatibility helpers.
+"""
+
+import sys
+
+# `@dataclass(slots=True)` needs Python 3.10+; on 3.9 the dataclasses
+# simply keep their instance __dict__.
+DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
@@ -3,10 +3,33 @@ Utility functions for I/O and visualization.
 """
 
 import pandas as pd
+import pyarrow.parquet as pq
 import os
 
 
-def load_experiment_data(path='data/experiment_users.parquet'):
+# Label columns stored as pandas categoricals after loading
+CATEGORICAL_COLUMNS = ['variant', 'device_category', 'country', 'experiment_id']
+
+
+def _resolve_data_path(path):
+    """Absolute path for `path` (relative to project root); must exist."""
+    full_path = os.path.join(os.path.dirname(__file__), '../..', path)
+    if not os.path.exists(full_path):
+        raise FileNotFoundError(f"Data file not found: {full_path}")
+    return full_path
+
+
+def experiment_data_columns(path='data/experiment_users.parquet'):
+    """
+    Column names stored in an experiment parquet file.
+    
+    Reads only the file footer, so callers can project onto columns that
+    actually exist before calling `load_experiment_data`.
+    """
+    return pq.read_schema(_resolve_data_path(path)).names
+
+
+def load_experiment_data(path='data/experiment_users.parquet', columns=None):
     """
     Load experiment dataset.
     
@@ -14,20 +37,34 @@ def load_experiment_data(path='data/experiment_users.parquet'):
     ----------
     path : str
         Path to parquet file (relative to project root)
+    columns : list of str, optional
+        Columns to read. Parquet is columnar, so unlisted columns are never
+        read or decompressed. Defaults to all columns.
     
     Returns
     -------
     pd.DataFrame
-        Experiment data
+        Experiment data (experiment ID, if recorded, in ``df.attrs``)
     """
-    full_path = os.path.join(os.path.dirname(__file__), '../..', path)
-    if not os.path.exists(full_path):
-        raise FileNotFoundError(f"Data file not found: {full_path}")
+    full_path = _resolve_data_path(path)
+    
+    df = pd.read_parquet(full_path, columns=columns, engine='pyarrow', use_threads=True)
+    
+    # Low-cardinality labels as categoricals (already the case for files
+    # written by the generator, which stores them dictionary-encoded)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    
+    # The generator records the experiment ID in the parquet file metadata
+    metadata = pq.read_schema(full_path).metadata or {}
+    if b'experiment_id' in metadata:
+        df.attrs['experiment_id'] = metadata[b'experiment_id'].decode()
     
-    return pd.read_parquet(full_path)
+    return df
 
 
-def save_figure(fig, filename, output_dir='figures'):
+def save_figure(fig, filename, output_dir='figures', dpi=150, bbox_inches='tight'):
     """
     Save matplotlib figure to output directory.
     
@@ -36,9 +73,14 @@ def save_figure(fig, filename, output_dir='figures'):
     fig : matplotlib.figure.Figure
         Figure to save
     filename : str
-        Filename (without path)
+        Filename (without path); the extension selects the format
     output_dir : str
         Output directory relative to project root
+    dpi : int
+        Raster resolution. 150 is plenty for screen use; pass 300 for print.
+        Render time scales with pixel count.
+    bbox_inches : str or None
+        'tight' crops whitespace (costs an extra layout pass); None skips it
     
     Returns
     -------
@@ -49,7 +91,7 @@ def save_figure(fig, filename, output_dir='figures'):
     os.makedirs(full_dir, exist_ok=True)
     
     full_path = os.path.join(full_dir, filename)
-    fig.savefig(full_path, dpi=300, bbox_inches='tight')
+    fig.savefig(full_path, dpi=dpi, bbox_inches=bbox_inches)
     print(f"✓ Saved figure: {output_dir}/{filename}")
     
     return full_path
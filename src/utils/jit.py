@@ -0,0 +1,55 @@
+"""
+Optional Numba JIT support.
+
+Numba is not a required dependency. When it is not installed, `njit`
+returns the decorated function unchanged and `prange` falls back to
+`range`, so kernels still import and run as plain Python. Callers should
+check `NUMBA_AVAILABLE` before choosing a kernel over a NumPy path.
+
+Numba itself is imported lazily: `njit` compiles on a kernel's first
+call, and only accessing `prange` imports it eagerly. Modules that merely
+define kernels (e.g. stats.inference, pulled in by reporting) therefore
+do not pay Numba's import cost at startup.
+"""
+
+import importlib.util
+from functools import update_wrapper
+
+NUMBA_AVAILABLE = importlib.util.find_spec('numba') is not None
+
+
+class _LazyJit:
+    """Kernel wrapper that imports Numba and compiles on first call."""
+
+    def __init__(self, func, options):
+        self._func = func
+        self._options = options
+        self._compiled = None
+        update_wrapper(self, func)
+
+    def __call__(self, *args):
+        if self._compiled is None:
+            from numba import njit as numba_njit
+            self._compiled = numba_njit(**self._options)(self._func)
+        return self._compiled(*args)
+
+
+def njit(*args, **kwargs):
+    """numba.njit, deferred to first call (supports bare and called forms)."""
+    def decorator(func):
+        return _LazyJit(func, kwargs) if NUMBA_AVAILABLE else func
+
+    if len(args) == 1 and callable(args[0]) and not kwargs:
+        return decorator(args[0])
+    return decorator
+
+
+def __getattr__(name):
+    # Kernels using prange must see numba.prange when they are compiled,
+    # so importing it from here loads Numba (when installed)
+    if name == 'prange':
+        if NUMBA_AVAILABLE:
+            from numba import prange
+            return prange
+        return range
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,24 +3,45 @@ Visualization script for A/B test analysis.
 Creates the required 3 figures.
 """
 
+import os
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+matplotlib.use('Agg')  # File output only; skip interactive backend startup
 import matplotlib.pyplot as plt
-import sys
-import os
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from ..metrics.compute import MetricComputer
+from ..stats.inference import InferenceEngine
+from .io import load_experiment_data, save_figure
 
-from src.metrics.compute import MetricComputer
-from src.stats.inference import InferenceEngine
-from src.utils.io import load_experiment_data, save_figure
+
+def _prepare_figure(fig, figsize):
+    """
+    Return (fig, ax) for a figure builder.
+    
+    Creates a new figure, or clears and resizes `fig` so a long-lived
+    process can reuse one Figure instead of constructing a new one per plot.
+    """
+    if fig is None:
+        return plt.subplots(figsize=figsize)
+    
+    fig.clear()
+    fig.set_size_inches(*figsize)
+    fig.subplots_adjust(**{
+        side: plt.rcParams[f'figure.subplot.{side}']
+        for side in ('left', 'right', 'bottom', 'top')
+    })
+    return fig, fig.add_subplot()
 
 
-def create_metric_comparison_table(ctr_metric, cvr_metric, ctr_inf, cvr_inf):
+def create_metric_comparison_table(ctr_metric, cvr_metric, ctr_inf, cvr_inf, fig=None):
     """
     Create figure 1: Metric comparison table with lifts.
+    
+    Pass `fig` to draw into an existing Figure (it is cleared first).
     """
-    fig, ax = plt.subplots(figsize=(12, 4))
+    fig, ax = _prepare_figure(fig, figsize=(12, 4))
     ax.axis('tight')
     ax.axis('off')
     
@@ -66,17 +87,19 @@ def create_metric_comparison_table(ctr_metric, cvr_metric, ctr_inf, cvr_inf):
                     cell.set_facecolor('#D4EDDA')
                     cell.set_text_props(weight='bold', color='#155724')
     
-    plt.title('A/B Test Results: Homepage Redesign V1', 
-              fontsize=14, weight='bold', pad=20)
+    ax.set_title('A/B Test Results: Homepage Redesign V1', 
+                 fontsize=14, weight='bold', pad=20)
     
     return fig
 
 
-def create_ci_plot(cvr_inf):
+def create_ci_plot(cvr_inf, fig=None):
     """
     Create figure 2: Confidence interval plot for CVR lift.
+    
+    Pass `fig` to draw into an existing Figure (it is cleared first).
     """
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig, ax = _prepare_figure(fig, figsize=(10, 6))
     
     # Data
     metrics = ['CVR Lift']
@@ -125,50 +148,53 @@ def create_ci_plot(cvr_inf):
         color = '#757575'
     
     # Adjust layout first to make room for bottom text
-    plt.tight_layout()
+    fig.tight_layout()
     
     # Add conclusion text below the plot with more space
     fig.text(0.5, 0.01, conclusion, ha='center', fontsize=10, 
              style='italic', weight='bold', color=color)
     
     # Add extra bottom margin to prevent overlap
-    plt.subplots_adjust(bottom=0.15)
+    fig.subplots_adjust(bottom=0.15)
     
     return fig
 
 
-def create_segment_lift_plot(df):
+def create_segment_lift_plot(segment_breakdown, fig=None):
     """
     Create figure 3: Segment-level lift plot (CVR by device).
+    
+    Takes the breakdown from the MetricComputer already built for the
+    headline metrics, so the eligibility filtering is not redone and only
+    the small summary table is passed to worker processes. Pass `fig` to
+    draw into an existing Figure (it is cleared first).
     """
-    computer = MetricComputer(df, eligible_only=True)
-    segment_breakdown = computer.compute_segment_breakdown('converted', 'device_category')
     segment_breakdown = segment_breakdown.sort_values('control_n', ascending=False)
     
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig, ax = _prepare_figure(fig, figsize=(10, 6))
     
     x_pos = np.arange(len(segment_breakdown))
     lifts = segment_breakdown['relative_lift_pct'].values
     segments = segment_breakdown['segment'].values
     
     # Color bars based on lift direction
-    colors = ['#2E7D32' if lift > 0 else '#C62828' for lift in lifts]
+    colors = np.where(lifts > 0, '#2E7D32', '#C62828').tolist()
     
     bars = ax.bar(x_pos, lifts, color=colors, alpha=0.7, edgecolor='black', linewidth=1.5)
     
-    # Add value labels on bars
-    for i, (bar, lift) in enumerate(zip(bars, lifts)):
-        height = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2., height,
-                f'{lift:+.1f}%',
-                ha='center', va='bottom' if height > 0 else 'top',
-                fontsize=11, weight='bold')
-        
-        # Add sample size below segment name
-        n_control = segment_breakdown.iloc[i]['control_n']
-        n_treatment = segment_breakdown.iloc[i]['treatment_n']
-        ax.text(bar.get_x() + bar.get_width()/2., -max(abs(lifts)) * 0.15,
-                f'n={n_control:,} | {n_treatment:,}',
+    # Add value labels on bars (placed above positive / below negative bars)
+    ax.bar_label(bars, labels=[f'{lift:+.1f}%' for lift in lifts],
+                 fontsize=11, weight='bold')
+    
+    # Add sample size below segment name
+    n_labels = [
+        f'n={n_control:,} | {n_treatment:,}'
+        for n_control, n_treatment in zip(segment_breakdown['control_n'],
+                                          segment_breakdown['treatment_n'])
+    ]
+    label_y = -np.abs(lifts).max() * 0.15
+    for x, n_label in zip(x_pos, n_labels):
+        ax.text(x, label_y, n_label,
                 ha='center', va='top', fontsize=8, style='italic', color='gray')
     
     # Add zero line
@@ -186,14 +212,28 @@ def create_segment_lift_plot(df):
              'Note: Segment-level results are for diagnosis only. Treatment effect varies by device.',
              ha='center', fontsize=9, style='italic', color='#757575')
     
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
 
+def _render_figure(builder, args, filename, save_kwargs):
+    """
+    Build one figure, save it and release it.
+    
+    Top-level so it can run in a worker process.
+    """
+    fig = builder(*args)
+    full_path = save_figure(fig, filename, **save_kwargs)
+    plt.close(fig)
+    return full_path
+
+
 def main():
     """Generate all 3 required figures."""
     print("Loading experiment data...")
-    df = load_experiment_data()
+    df = load_experiment_data(
+        columns=['variant', 'eligible', 'clicked', 'converted', 'device_category']
+    )
     
     print("Computing metrics...")
     computer = MetricComputer(df, eligible_only=True)
@@ -205,25 +245,40 @@ def main():
     ctr_inf = engine.analyze_metric(ctr_metric)
     cvr_inf = engine.analyze_metric(cvr_metric)
     
+    segment_breakdown = computer.compute_segment_breakdown('converted', 'device_category')
+    
     print("\nGenerating visualizations...")
     
-    # Figure 1: Metric comparison table
-    print("  Creating Figure 1: Metric comparison table...")
-    fig1 = create_metric_comparison_table(ctr_metric, cvr_metric, ctr_inf, cvr_inf)
-    save_figure(fig1, 'metric_comparison.png')
-    plt.close(fig1)
-    
-    # Figure 2: CI plot
-    print("  Creating Figure 2: Confidence interval plot...")
-    fig2 = create_ci_plot(cvr_inf)
-    save_figure(fig2, 'cvr_confidence_interval.png')
-    plt.close(fig2)
-    
-    # Figure 3: Segment lifts
-    print("  Creating Figure 3: Segment lift plot...")
-    fig3 = create_segment_lift_plot(df)
-    save_figure(fig3, 'segment_lifts_by_device.png')
-    plt.close(fig3)
+    # (description, builder, builder args, filename, save_figure kwargs)
+    jobs = [
+        ("Figure 1: Metric comparison table", create_metric_comparison_table,
+         (ctr_metric, cvr_metric, ctr_inf, cvr_inf), 'metric_comparison.png',
+         {'dpi': 100}),  # Text-only table
+        ("Figure 2: Confidence interval plot", create_ci_plot,
+         (cvr_inf,), 'cvr_confidence_interval.png', {}),
+        ("Figure 3: Segment lift plot", create_segment_lift_plot,
+         (segment_breakdown,), 'segment_lifts_by_device.png', {}),
+    ]
+    
+    # Figures are independent and matplotlib is not thread-safe, so render
+    # them in separate processes when there is more than one CPU to use;
+    # otherwise worker startup only adds overhead
+    max_workers = min(len(jobs), os.cpu_count() or 1)
+    if max_workers == 1:
+        for description, builder, args, filename, save_kwargs in jobs:
+            print(f"  Creating {description}...")
+            _render_figure(builder, args, filename, save_kwargs)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = []
+            for description, builder, args, filename, save_kwargs in jobs:
+                print(f"  Creating {description}...")
+                futures.append(executor.submit(
+                    _render_figure, builder, args, filename, save_kwargs
+                ))
+            
+            for future in futures:
+                future.result()  # Re-raise any worker error
     
     print("\n✓ All visualizations generated successfully!")
 
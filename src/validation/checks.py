@@ -10,13 +10,24 @@ import numpy as np
 from dataclasses import dataclass
 from typing import List, Dict
 import sys
-import os
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-from src import config
+from .. import config
+from ..utils.compat import DATACLASS_SLOTS
+from ..utils.io import experiment_data_columns, load_experiment_data
 
 
-@dataclass
+# Columns every experiment dataset must provide
+REQUIRED_COLUMNS = [
+    'user_id', 'experiment_id', 'variant', 'assigned_at',
+    'first_exposed_at', 'eligible', 'clicked', 'converted',
+    'device_category', 'country'
+]
+
+# Required columns that must not contain nulls
+REQUIRED_NON_NULL = ['user_id', 'variant', 'eligible', 'clicked', 'converted']
+
+
+@dataclass(**DATACLASS_SLOTS)
 class ValidationResult:
     """Container for a single validation check result."""
     check_name: str
@@ -29,7 +40,7 @@ class ValidationResult:
         return f"[{status}] {self.check_name}: {self.message}"
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class ValidationReport:
     """Aggregated results from all validation checks."""
     results: List[ValidationResult]
@@ -79,29 +90,46 @@ class DataValidator:
     def __init__(self, df: pd.DataFrame):
         self.df = df
         self.results = []
+        
+        # Extract NumPy-backed scanned columns once so reductions skip pandas
+        # dispatch. Extension dtypes (categoricals, strings) are left to their
+        # own vectorized methods: to_numpy() would box them into object
+        # arrays. Missing columns are reported by the schema check.
+        self._arrays = {
+            col: df[col].to_numpy(copy=False)
+            for col in REQUIRED_NON_NULL
+            if col in df.columns and isinstance(df[col].dtype, np.dtype)
+        }
     
     def validate(self) -> ValidationReport:
         """Run all validation checks and return aggregated report."""
         print("Running validation checks...")
         
+        # Scan each column the checks share once, up front
+        null_counts = self._count_nulls()
+        variant_codes, variant_labels = pd.factorize(self.df['variant'])
+        variant_counts = np.bincount(
+            variant_codes[variant_codes >= 0], minlength=len(variant_labels)
+        )
+        n_missing_variants = int((variant_codes < 0).sum())
+        eligible = self._arrays.get('eligible')
+        if eligible is None or eligible.dtype != np.bool_:
+            # Object/nullable column: count missing values as not eligible
+            eligible = self.df['eligible'].to_numpy(dtype=bool, na_value=False)
+        eligible_count = int(np.count_nonzero(eligible))
+        
         self._check_schema()
-        self._check_nulls()
-        self._check_variants()
-        self._check_sample_ratio_mismatch()
+        self._check_nulls(null_counts)
+        self._check_variants(variant_labels, variant_counts, n_missing_variants)
+        self._check_sample_ratio_mismatch(variant_labels, variant_counts)
         self._check_contamination()
-        self._check_eligibility()
+        self._check_eligibility(eligible_count)
         
         return ValidationReport(self.results)
     
     def _check_schema(self):
         """Verify required columns are present with correct types."""
-        required_cols = [
-            'user_id', 'experiment_id', 'variant', 'assigned_at',
-            'first_exposed_at', 'eligible', 'clicked', 'converted',
-            'device_category', 'country'
-        ]
-        
-        missing = [col for col in required_cols if col not in self.df.columns]
+        missing = [col for col in REQUIRED_COLUMNS if col not in self.df.columns]
         
         if missing:
             self.results.append(ValidationResult(
@@ -113,16 +141,22 @@ class DataValidator:
             self.results.append(ValidationResult(
                 check_name="Schema Check",
                 passed=True,
-                message=f"All {len(required_cols)} required columns present"
+                message=f"All {len(REQUIRED_COLUMNS)} required columns present"
             ))
     
-    def _check_nulls(self):
+    def _count_nulls(self):
+        """Null counts for the required non-null fields that are present."""
+        counts = {}
+        for col in REQUIRED_NON_NULL:
+            if col in self._arrays:
+                counts[col] = np.count_nonzero(pd.isna(self._arrays[col]))
+            elif col in self.df.columns:
+                # Extension dtypes: Series.isna() works on codes/validity masks
+                counts[col] = int(self.df[col].isna().sum())
+        return pd.Series(counts, dtype=np.int64)
+    
+    def _check_nulls(self, null_counts):
         """Check for null values in required fields."""
-        required_non_null = [
-            'user_id', 'variant', 'eligible', 'clicked', 'converted'
-        ]
-        
-        null_counts = self.df[required_non_null].isnull().sum()
         has_nulls = null_counts.sum() > 0
         
         if has_nulls:
@@ -139,10 +173,12 @@ class DataValidator:
                 message="No nulls in required fields"
             ))
     
-    def _check_variants(self):
+    def _check_variants(self, variant_labels, variant_counts, n_missing):
         """Ensure only valid variants (control/treatment) are present."""
         valid_variants = {'control', 'treatment'}
-        actual_variants = set(self.df['variant'].unique())
+        actual_variants = set(variant_labels)
+        if n_missing:
+            actual_variants.add(None)
         
         invalid = actual_variants - valid_variants
         
@@ -153,14 +189,16 @@ class DataValidator:
                 message=f"Invalid variants found: {invalid}"
             ))
         else:
-            counts = self.df['variant'].value_counts().to_dict()
+            counts = {
+                label: int(count) for label, count in zip(variant_labels, variant_counts)
+            }
             self.results.append(ValidationResult(
                 check_name="Variant Integrity",
                 passed=True,
                 message=f"Valid variants only: {counts}"
             ))
     
-    def _check_sample_ratio_mismatch(self):
+    def _check_sample_ratio_mismatch(self, variant_labels, variant_counts):
         """
         Check for Sample Ratio Mismatch (SRM).
         
@@ -172,14 +210,15 @@ class DataValidator:
         
         We use a chi-square test to detect significant deviations.
         """
-        variant_counts = self.df['variant'].value_counts()
+        # Counts come from the shared factorize + bincount pass in validate()
+        observed = dict(zip(variant_labels, variant_counts.tolist()))
         total = len(self.df)
         
         expected_control = total * config.ALLOCATION_RATIO
         expected_treatment = total * (1 - config.ALLOCATION_RATIO)
         
-        observed_control = variant_counts.get('control', 0)
-        observed_treatment = variant_counts.get('treatment', 0)
+        observed_control = observed.get('control', 0)
+        observed_treatment = observed.get('treatment', 0)
         
         # Chi-square test for goodness of fit
         chi_square = (
@@ -215,14 +254,26 @@ class DataValidator:
         
         This should NEVER happen in a properly randomized experiment.
         """
-        user_variant_counts = self.df.groupby('user_id')['variant'].nunique()
-        contaminated_users = user_variant_counts[user_variant_counts > 1]
+        # Fast path: with one row per user, no user can be in two variants
+        user_ids = self._arrays.get('user_id', self.df['user_id'])
+        if pd.unique(user_ids).size == len(self.df):
+            n_contaminated = 0
+        else:
+            # Only users with repeated rows can be contaminated
+            dup_mask = self.df['user_id'].duplicated(keep=False)
+            sub = self.df.loc[dup_mask, ['user_id', 'variant']]
+            
+            # Hash-based dedup leaves one row per (user, variant) pair, so any
+            # user_id that still repeats was assigned to more than one variant
+            pairs = sub.dropna().drop_duplicates()
+            repeated = pairs['user_id'].duplicated(keep=False)
+            n_contaminated = pairs.loc[repeated, 'user_id'].nunique()
         
-        if len(contaminated_users) > 0:
+        if n_contaminated > 0:
             self.results.append(ValidationResult(
                 check_name="Contamination Check",
                 passed=False,
-                message=f"{len(contaminated_users)} users in multiple variants!"
+                message=f"{n_contaminated} users in multiple variants!"
             ))
         else:
             self.results.append(ValidationResult(
@@ -231,9 +282,8 @@ class DataValidator:
                 message="No contamination detected (1 variant per user)"
             ))
     
-    def _check_eligibility(self):
+    def _check_eligibility(self, eligible_count):
         """Check eligibility distribution and warn if too many ineligible users."""
-        eligible_count = self.df['eligible'].sum()
         total = len(self.df)
         eligible_pct = eligible_count / total * 100
         
@@ -253,14 +303,14 @@ class DataValidator:
             ))
 
 
-def main():
+def main(data_path='data/experiment_users.parquet'):
     """CLI for running validation on saved dataset."""
-    import sys
-    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-    
-    data_path = 'data/experiment_users.parquet'
     print(f"Loading data from {data_path}...")
-    df = pd.read_parquet(data_path)
+    # Project only required columns that exist; missing ones are reported
+    # by the schema check rather than failing the read
+    available = set(experiment_data_columns(data_path))
+    columns = [col for col in REQUIRED_COLUMNS if col in available]
+    df = load_experiment_data(data_path, columns=columns)
     
     validator = DataValidator(df)
     report = validator.validate()
@@ -0,0 +1,11 @@
+"""
+Shared pytest configuration.
+
+Makes the repository root importable so tests can `import src...`
+without each test module patching sys.path.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -5,78 +5,155 @@ Tests for validation checks.
 import pytest
 import pandas as pd
 import numpy as np
-import sys
-import os
+import pyarrow as pa
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.validation.checks import DataValidator, ValidationReport, main
 
-from src.validation.checks import DataValidator, ValidationReport
+VARIANT_LEVELS = ['control', 'treatment']
+DEVICE_LEVELS = ['mobile', 'desktop', 'tablet']
+COUNTRY_LEVELS = ['US', 'IN', 'CA']
+
+# Arrow-backed dtypes, for checking the validator also accepts them
+ARROW_STRING = pd.ArrowDtype(pa.string())
+ARROW_BOOL = pd.ArrowDtype(pa.bool_())
 
 
 def create_valid_dataset(n=1000):
     """Helper to create valid experiment data for testing."""
     rng = np.random.default_rng(42)
     
+    # One draw for the label codes (variant, device, country), one for the flags
+    codes = rng.integers(0, [2, 3, 3], size=(n, 3))
+    clicked, converted = rng.random((2, n)) < 0.5
+    assigned = np.full(n, np.datetime64('2024-10-01', 'ns'))
+    
     df = pd.DataFrame({
-        'user_id': [f'user_{i}' for i in range(n)],
+        'user_id': np.char.add('user_', np.arange(n).astype(str)),
         'experiment_id': ['homepage_redesign_v1'] * n,
-        'variant': rng.choice(['control', 'treatment'], n),
-        'assigned_at': pd.Timestamp('2024-10-01'),
-        'first_exposed_at': pd.Timestamp('2024-10-01'),
-        'eligible': [True] * n,
-        'clicked': rng.choice([True, False], n),
-        'converted': rng.choice([True, False], n),
-        'device_category': rng.choice(['mobile', 'desktop', 'tablet'], n),
-        'country': rng.choice(['US', 'IN', 'CA'], n)
+        'variant': pd.Categorical.from_codes(codes[:, 0], VARIANT_LEVELS),
+        'assigned_at': assigned,
+        'first_exposed_at': assigned,
+        'eligible': np.ones(n, dtype=bool),
+        'clicked': clicked,
+        'converted': converted,
+        'device_category': pd.Categorical.from_codes(codes[:, 1], DEVICE_LEVELS),
+        'country': pd.Categorical.from_codes(codes[:, 2], COUNTRY_LEVELS)
     })
     
     return df
 
 
-def test_schema_check_passes():
-    """Test that schema check passes with valid data."""
-    df = create_valid_dataset()
-    validator = DataValidator(df)
-    report = validator.validate()
+N_USERS = 1000
+
+
+@pytest.fixture(scope="session")
+def base_arrays():
+    """
+    Column arrays for the valid dataset, generated once per session.
+    
+    Holds N_USERS clean rows plus one extra row (index N_USERS) that
+    repeats user 0 with the same variant. Only `valid_df_plus_one`
+    includes that row, for the contamination test; the other fixtures use
+    the first N_USERS rows.
+    
+    NumPy columns are read-only, but the categorical columns are not, so
+    frames must be built with `_frame`: the DataFrame constructor copies
+    every column, giving each test its own frame to modify.
+    """
+    df = create_valid_dataset(N_USERS + 1)
+    df.loc[N_USERS, 'user_id'] = df.at[0, 'user_id']
+    df.loc[N_USERS, 'variant'] = df.at[0, 'variant']
     
+    arrays = {}
+    for col in df.columns:
+        arr = df[col].array
+        if isinstance(df[col].dtype, np.dtype):
+            arr = df[col].to_numpy(copy=True)
+            arr.setflags(write=False)
+        arrays[col] = arr
+    return arrays
+
+
+def _frame(arrays, n):
+    """Fresh DataFrame over the first n rows of `arrays` (all columns are copied)."""
+    return pd.DataFrame({col: arr[:n] for col, arr in arrays.items()})
+
+
+@pytest.fixture
+def valid_df_plus_one(base_arrays):
+    """Valid dataset plus a trailing same-variant duplicate of user 0 (see base_arrays)."""
+    return _frame(base_arrays, N_USERS + 1)
+
+
+@pytest.fixture
+def valid_df(base_arrays):
+    """Valid dataset, freshly built for each test."""
+    return _frame(base_arrays, N_USERS)
+
+
+@pytest.fixture(scope="module")
+def clean_report(base_arrays):
+    """Validation report for the unmodified valid dataset."""
+    return DataValidator(_frame(base_arrays, N_USERS)).validate()
+
+
+def test_schema_check_passes(clean_report):
+    """Test that schema check passes with valid data."""
     # Check that schema check passed
-    schema_result = [r for r in report.results if r.check_name == "Schema Check"][0]
+    by_name = {r.check_name: r for r in clean_report.results}
+    schema_result = by_name["Schema Check"]
     assert schema_result.passed, "Schema check should pass with valid data"
 
 
-def test_schema_check_fails_missing_columns():
+def test_schema_check_fails_missing_columns(valid_df):
     """Test that schema check fails when required columns are missing."""
-    df = create_valid_dataset()
-    df = df.drop(columns=['clicked'])  # Remove required column
+    df = valid_df.drop(columns=['clicked'])  # Remove required column
     
     validator = DataValidator(df)
     report = validator.validate()
     
-    schema_result = [r for r in report.results if r.check_name == "Schema Check"][0]
+    by_name = {r.check_name: r for r in report.results}
+    schema_result = by_name["Schema Check"]
     assert not schema_result.passed, "Schema check should fail with missing columns"
 
 
-def test_null_check_fails():
+def test_cli_reports_missing_column_as_schema_failure(tmp_path, capsys):
+    """Test that the CLI fails the schema check instead of crashing on a missing column."""
+    path = tmp_path / 'experiment_users.parquet'
+    create_valid_dataset().drop(columns=['country']).to_parquet(path)
+    
+    with pytest.raises(SystemExit) as exc_info:
+        main(str(path))
+    
+    assert exc_info.value.code == 1
+    assert "[✗ FAIL] Schema Check" in capsys.readouterr().out
+
+
+def test_null_check_fails(valid_df):
     """Test that null check fails when required fields have nulls."""
-    df = create_valid_dataset()
-    df.loc[0:10, 'variant'] = None  # Introduce nulls
+    variant = valid_df['variant'].copy()
+    variant.loc[0:10] = None  # Introduce nulls
+    df = valid_df.assign(variant=variant)
     
     validator = DataValidator(df)
     report = validator.validate()
     
-    null_result = [r for r in report.results if r.check_name == "Null Check"][0]
+    by_name = {r.check_name: r for r in report.results}
+    null_result = by_name["Null Check"]
     assert not null_result.passed, "Null check should fail with null values"
 
 
-def test_variant_integrity_fails():
+def test_variant_integrity_fails(valid_df):
     """Test that variant check fails with invalid variants."""
-    df = create_valid_dataset()
-    df.loc[0:10, 'variant'] = 'invalid_variant'
+    variant = valid_df['variant'].cat.add_categories(['invalid_variant'])
+    variant.loc[0:10] = 'invalid_variant'
+    df = valid_df.assign(variant=variant)
     
     validator = DataValidator(df)
     report = validator.validate()
     
-    variant_result = [r for r in report.results if r.check_name == "Variant Integrity"][0]
+    by_name = {r.check_name: r for r in report.results}
+    variant_result = by_name["Variant Integrity"]
     assert not variant_result.passed, "Variant check should fail with invalid variants"
 
 
@@ -86,38 +163,52 @@ def test_sample_ratio_mismatch_detection():
     
     # Artificially create severe imbalance (90/10 instead of 50/50)
     n_control = int(0.9 * len(df))
-    df['variant'] = ['control'] * n_control + ['treatment'] * (len(df) - n_control)
+    df['variant'] = np.where(np.arange(len(df)) < n_control, 'control', 'treatment')
     
     validator = DataValidator(df)
     report = validator.validate()
     
-    srm_result = [r for r in report.results if "SRM" in r.check_name][0]
+    srm_result = next(r for r in report.results if "SRM" in r.check_name)
     assert not srm_result.passed, "SRM should be detected with severe imbalance"
 
 
-def test_contamination_detection():
+def test_contamination_detection(valid_df_plus_one):
     """Test that contamination is detected when users have multiple variants."""
-    df = create_valid_dataset()
-    
-    # Duplicate a user with different variant (contamination)
-    contaminated_row = df.iloc[0:1].copy()
-    contaminated_row['variant'] = 'treatment' if contaminated_row['variant'].iloc[0] == 'control' else 'control'
-    df = pd.concat([df, contaminated_row], ignore_index=True)
+    # Give the trailing duplicate of user 0 the other variant (contamination)
+    variant = valid_df_plus_one['variant'].copy()
+    variant.at[N_USERS] = 'treatment' if variant.at[0] == 'control' else 'control'
+    df = valid_df_plus_one.assign(variant=variant)
     
     validator = DataValidator(df)
     report = validator.validate()
     
-    contamination_result = [r for r in report.results if "Contamination" in r.check_name][0]
+    contamination_result = next(r for r in report.results if "Contamination" in r.check_name)
     assert not contamination_result.passed, "Contamination should be detected"
 
 
-def test_overall_validation_passes():
-    """Test that overall validation passes with clean data."""
-    df = create_valid_dataset()
-    validator = DataValidator(df)
-    report = validator.validate()
+def test_arrow_backed_columns_validate(valid_df):
+    """Test that Arrow-backed string and flag columns validate like NumPy ones."""
+    df = valid_df.astype({
+        'user_id': ARROW_STRING,
+        'experiment_id': ARROW_STRING,
+        'eligible': ARROW_BOOL,
+        'clicked': ARROW_BOOL,
+        'converted': ARROW_BOOL
+    })
     
-    assert report.passed, "Overall validation should pass with valid data"
+    assert DataValidator(df).validate().passed, "Arrow-backed clean data should pass"
+    
+    # Nulls in an Arrow-backed required field are still caught
+    user_id = df['user_id'].copy()
+    user_id.iloc[:5] = None
+    report = DataValidator(df.assign(user_id=user_id)).validate()
+    by_name = {r.check_name: r for r in report.results}
+    assert not by_name["Null Check"].passed, "Null check should fail with Arrow nulls"
+
+
+def test_overall_validation_passes(clean_report):
+    """Test that overall validation passes with clean data."""
+    assert clean_report.passed, "Overall validation should pass with valid data"
 
 
 if __name__ == '__main__':
@@ -0,0 +1,60 @@
+"""
+Tests for synthetic data generation.
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from src import config
+from src.data_generation.generator import ExperimentDataGenerator, _clicks_kernel
+from src.utils.io import load_experiment_data
+
+
+def test_chunked_save_round_trip(tmp_path):
+    """Test that a multi-chunk streamed save loads back as one consistent dataset."""
+    generator = ExperimentDataGenerator(n_users=2500, seed=7)
+    path = tmp_path / 'experiment_users.parquet'
+    
+    generator.save(generator.generate_chunks(chunk_size=1000), str(path))
+    df = load_experiment_data(str(path))
+    
+    # Same schema as a single in-memory generate()
+    expected = ExperimentDataGenerator(n_users=10, seed=7).generate()
+    assert list(df.columns) == list(expected.columns)
+    assert df.dtypes.astype(str).to_dict() == expected.dtypes.astype(str).to_dict()
+    
+    assert len(df) == 2500
+    assert df['user_id'].is_unique
+    assert df.attrs['experiment_id'] == config.EXPERIMENT_ID
+
+
+def test_generate_chunks_is_deterministic():
+    """Test that chunks depend only on the seed, not on earlier use of the generator."""
+    fresh = ExperimentDataGenerator(n_users=2500, seed=7)
+    used = ExperimentDataGenerator(n_users=2500, seed=7)
+    used.generate()  # Advances the instance RNG
+    
+    for a, b in zip(fresh.generate_chunks(chunk_size=1000), used.generate_chunks(chunk_size=1000)):
+        pd.testing.assert_frame_equal(a, b)
+
+
+def test_clicks_kernel_matches_numpy_path():
+    """Test that the (optionally JIT-compiled) click kernel matches the NumPy path."""
+    rng = np.random.default_rng(0)
+    n = 2000
+    is_treatment = rng.random(n) < 0.5
+    device_codes = rng.integers(0, 3, size=n)
+    device_mult = np.array([1.3, 1.0, 0.8])
+    ctr0, ctr_lift = 0.12, 0.015
+    u_click = rng.random(n)
+    
+    clicked = np.empty(n, dtype=np.bool_)
+    _clicks_kernel(is_treatment, device_codes, device_mult, ctr0, ctr_lift, u_click, clicked)
+    
+    ctr = np.where(is_treatment, ctr0 + ctr_lift * device_mult[device_codes], ctr0)
+    np.testing.assert_array_equal(clicked, u_click < ctr)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
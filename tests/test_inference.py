@@ -4,33 +4,92 @@ Tests for statistical inference.
 
 import pytest
 import numpy as np
-import sys
-import os
-
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from functools import lru_cache
 
 from src.stats.inference import InferenceEngine
 from src.metrics.compute import MetricReport
 
 
-def test_confidence_interval_bounds():
-    """Test that CI bounds are reasonable and ordered correctly."""
-    # Create a metric report with known values
-    metric = MetricReport(
-        metric_name='Test CVR',
-        control_n=10000,
-        control_successes=350,
-        control_rate=0.035,
-        treatment_n=10000,
-        treatment_successes=430,
-        treatment_rate=0.043,
-        absolute_lift=0.008,
-        relative_lift_pct=22.86
-    )
-    
-    engine = InferenceEngine(confidence_level=0.95)
-    inference = engine.analyze_metric(metric)
-    
+# MetricReport is frozen, so these module-level reports are safe to share
+
+# Known values with a moderate lift
+_CVR_METRIC = MetricReport(
+    metric_name='Test CVR',
+    control_n=10000,
+    control_successes=350,
+    control_rate=0.035,
+    treatment_n=10000,
+    treatment_successes=430,
+    treatment_rate=0.043,
+    absolute_lift=0.008,
+    relative_lift_pct=22.86
+)
+
+_CTR_METRIC = MetricReport(
+    metric_name='Test CTR',
+    control_n=10000,
+    control_successes=1200,
+    control_rate=0.12,
+    treatment_n=10000,
+    treatment_successes=1350,
+    treatment_rate=0.135,
+    absolute_lift=0.015,
+    relative_lift_pct=12.5
+)
+
+# Identical rates should give CI around zero
+_NO_EFFECT_METRIC = MetricReport(
+    metric_name='Test CVR - No Effect',
+    control_n=10000,
+    control_successes=700,
+    control_rate=0.07,
+    treatment_n=10000,
+    treatment_successes=700,
+    treatment_rate=0.07,
+    absolute_lift=0.0,
+    relative_lift_pct=0.0
+)
+
+# Substantial lift
+_LARGE_EFFECT_METRIC = MetricReport(
+    metric_name='Test CVR - Large Effect',
+    control_n=5000,
+    control_successes=175,
+    control_rate=0.035,
+    treatment_n=5000,
+    treatment_successes=350,
+    treatment_rate=0.07,
+    absolute_lift=0.035,
+    relative_lift_pct=100.0
+)
+
+_SMALL_SAMPLE_METRIC = MetricReport(
+    metric_name='Test',
+    control_n=1000,
+    control_successes=100,
+    control_rate=0.1,
+    treatment_n=1000,
+    treatment_successes=120,
+    treatment_rate=0.12,
+    absolute_lift=0.02,
+    relative_lift_pct=20.0
+)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    """Shared 95% engine; InferenceEngine holds no per-call state."""
+    return InferenceEngine(confidence_level=0.95)
+
+
+@lru_cache(maxsize=None)
+def _analyze(engine, metric):
+    """analyze_metric memoized on (engine, metric); MetricReport is frozen."""
+    return engine.analyze_metric(metric)
+
+
+def _check_ci_bounds(inference):
+    """CI bounds are reasonable and ordered correctly."""
     # CI should contain the point estimate
     assert inference.ci_lower <= inference.absolute_lift <= inference.ci_upper, \
         "CI should contain point estimate"
@@ -40,24 +99,8 @@ def test_confidence_interval_bounds():
         "Lower bound should be less than upper bound"
 
 
-def test_no_effect_confidence_interval():
-    """Test CI when there's no difference between groups."""
-    # Identical rates should give CI around zero
-    metric = MetricReport(
-        metric_name='Test CVR - No Effect',
-        control_n=5000,
-        control_successes=350,
-        control_rate=0.07,
-        treatment_n=5000,
-        treatment_successes=350,
-        treatment_rate=0.07,
-        absolute_lift=0.0,
-        relative_lift_pct=0.0
-    )
-    
-    engine = InferenceEngine(confidence_level=0.95)
-    inference = engine.analyze_metric(metric)
-    
+def _check_no_effect(inference):
+    """Identical rates give a CI around zero and a high p-value."""
     # CI should be narrow and centered around zero
     assert abs(inference.ci_lower) < 0.01, "Lower bound should be close to zero"
     assert abs(inference.ci_upper) < 0.01, "Upper bound should be close to zero"
@@ -66,24 +109,8 @@ def test_no_effect_confidence_interval():
     assert inference.p_value > 0.05, "P-value should be > 0.05 for no effect"
 
 
-def test_large_effect_significance():
-    """Test that large effects are detected as significant."""
-    # Create a metric with substantial lift
-    metric = MetricReport(
-        metric_name='Test CVR - Large Effect',
-        control_n=5000,
-        control_successes=175,
-        control_rate=0.035,
-        treatment_n=5000,
-        treatment_successes=350,
-        treatment_rate=0.07,
-        absolute_lift=0.035,
-        relative_lift_pct=100.0
-    )
-    
-    engine = InferenceEngine(confidence_level=0.95)
-    inference = engine.analyze_metric(metric)
-    
+def _check_large_effect(inference):
+    """Large effects are detected as significant."""
     # Should be statistically significant
     assert inference.statistically_significant, "Large effect should be significant"
     assert inference.p_value < 0.001, "P-value should be very small"
@@ -92,14 +119,29 @@ def test_large_effect_significance():
     assert inference.ci_lower > 0, "Lower bound should be positive for positive effect"
 
 
-def test_mde_computation():
+def _check_p_value_bounds(inference):
+    """P-values are always between 0 and 1."""
+    assert 0 <= inference.p_value <= 1, "P-value must be between 0 and 1"
+
+
+@pytest.mark.parametrize("metric,check", [
+    pytest.param(_CVR_METRIC, _check_ci_bounds, id='confidence_interval_bounds'),
+    pytest.param(_NO_EFFECT_METRIC, _check_no_effect, id='no_effect_confidence_interval'),
+    pytest.param(_LARGE_EFFECT_METRIC, _check_large_effect, id='large_effect_significance'),
+    pytest.param(_SMALL_SAMPLE_METRIC, _check_p_value_bounds, id='p_value_bounds'),
+])
+def test_analyze_metric(engine, metric, check):
+    """Test analyze_metric results against each case's expectations."""
+    check(_analyze(engine, metric))
+
+
+@pytest.mark.parametrize("baseline_cvr,n_per_variant", [
+    (0.035, 25000),  # Typical A/B test
+    (0.035, 5000),
+    (0.12, 25000),
+])
+def test_mde_computation(engine, baseline_cvr, n_per_variant):
     """Test that MDE computation returns reasonable values."""
-    engine = InferenceEngine(confidence_level=0.95)
-    
-    # Compute MDE for typical A/B test
-    baseline_cvr = 0.035
-    n_per_variant = 25000
-    
     mde = engine.compute_mde(baseline_cvr, n_per_variant, power=0.8)
     
     # MDE should be positive and reasonable
@@ -111,24 +153,97 @@ def test_mde_computation():
     assert mde_large < mde, "Larger sample should give smaller MDE"
 
 
-def test_p_value_bounds():
-    """Test that p-values are always between 0 and 1."""
+def test_analyze_metrics_matches_analyze_metric(engine):
+    """Test that batch inference agrees with per-metric inference."""
+    metrics = [_CTR_METRIC, _CVR_METRIC]
+    
+    batch = engine.analyze_metrics(metrics)
+    
+    assert len(batch) == len(metrics)
+    for metric, result in zip(metrics, batch):
+        single = _analyze(engine, metric)
+        assert result.metric_name == single.metric_name
+        assert result.ci_lower == pytest.approx(single.ci_lower)
+        assert result.ci_upper == pytest.approx(single.ci_upper)
+        assert result.p_value == pytest.approx(single.p_value)
+        assert result.statistically_significant == single.statistically_significant
+
+
+def test_zero_variance_report_matches_across_paths(engine):
+    """Test that a report with no conversions in either group gives p=1 on both paths."""
     metric = MetricReport(
-        metric_name='Test',
-        control_n=1000,
-        control_successes=100,
-        control_rate=0.1,
-        treatment_n=1000,
-        treatment_successes=120,
-        treatment_rate=0.12,
-        absolute_lift=0.02,
-        relative_lift_pct=20.0
+        metric_name='Test CVR - No Conversions',
+        control_n=200,
+        control_successes=0,
+        control_rate=0.0,
+        treatment_n=180,
+        treatment_successes=0,
+        treatment_rate=0.0,
+        absolute_lift=0.0,
+        relative_lift_pct=0.0
     )
     
-    engine = InferenceEngine()
-    inference = engine.analyze_metric(metric)
+    single = engine.analyze_metric(metric)
+    batch = engine.analyze_metrics([metric])[0]
     
-    assert 0 <= inference.p_value <= 1, "P-value must be between 0 and 1"
+    assert single.p_value == 1.0
+    assert batch.p_value == single.p_value
+    assert not batch.statistically_significant
+
+
+def test_adjust_pvalues_benjamini_hochberg():
+    """Test BH adjustment against hand-computed values."""
+    p_values = np.array([0.04, 0.01, 0.03, 0.20])
+    
+    adjusted = InferenceEngine.adjust_pvalues(p_values, method='bh')
+    
+    # Sorted: 0.01*4/1=0.04, 0.03*4/2=0.06, 0.04*4/3=0.0533 -> 0.0533, 0.20*4/4=0.20
+    expected = np.array([0.04 * 4 / 3, 0.04, 0.04 * 4 / 3, 0.20])
+    np.testing.assert_allclose(adjusted, expected)
+    assert np.all(adjusted >= p_values), "Adjusted p-values should not shrink"
+
+
+def test_unpooled_se_pvalue_agrees_with_ci(engine):
+    """Test that the unpooled-SE option makes significance match the CI."""
+    pooled = _analyze(engine, _CVR_METRIC)
+    unpooled_engine = InferenceEngine(confidence_level=0.95, use_unpooled_se=True)
+    unpooled = _analyze(unpooled_engine, _CVR_METRIC)
+    
+    # Same CI; p-value close to the pooled z-test at this sample size
+    assert unpooled.ci_lower == pytest.approx(pooled.ci_lower)
+    assert unpooled.ci_upper == pytest.approx(pooled.ci_upper)
+    assert unpooled.p_value == pytest.approx(pooled.p_value, rel=0.05)
+    
+    excludes_zero = unpooled.ci_lower > 0 or unpooled.ci_upper < 0
+    assert unpooled.statistically_significant == excludes_zero
+    
+    batch = unpooled_engine.analyze_metrics([_CVR_METRIC])[0]
+    assert batch.p_value == pytest.approx(unpooled.p_value)
+
+
+def test_unpooled_se_zero_variance_with_effect():
+    """Test 0% vs 100% rates (zero unpooled SE) is significant on both paths."""
+    metric = MetricReport(
+        metric_name='Test CVR - All vs None',
+        control_n=50,
+        control_successes=0,
+        control_rate=0.0,
+        treatment_n=50,
+        treatment_successes=50,
+        treatment_rate=1.0,
+        absolute_lift=1.0,
+        relative_lift_pct=0.0
+    )
+    
+    unpooled_engine = InferenceEngine(confidence_level=0.95, use_unpooled_se=True)
+    single = unpooled_engine.analyze_metric(metric)
+    batch = unpooled_engine.analyze_metrics([metric])[0]
+    
+    assert single.ci_lower == pytest.approx(1.0)
+    assert single.p_value == 0.0, "An exact non-zero difference should have p=0"
+    assert single.statistically_significant
+    assert batch.p_value == single.p_value
+    assert batch.statistically_significant == single.statistically_significant
 
 
 if __name__ == '__main__':